@@ -1,199 +1,696 @@
 import os
-import requests
+import sys
 import csv
+import json
 import time
+import random
+import email.utils
+import hashlib
+import operator
+import functools
+import itertools
+import collections
+import concurrent.futures
+import sqlite3
+import asyncio
+import logging
+import argparse
+import httpx
 
-def search_semantic_scholar(query, max_papers=1000, batch_size=10):
+log = logging.getLogger(__name__)
+
+# HTTP/2 lets all in-flight batches share one connection; httpx needs the h2 package for it
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+# orjson parses the (often several hundred KB) responses much faster; fall back to the stdlib
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+# Transient statuses that are retried, mirroring urllib3's Retry(status_forcelist=...)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+POLLING_INTERVAL = 0.5  # Base retry delay in seconds, doubled after every retry
+MAX_BACKOFF = 30  # Upper bound in seconds for a single retry delay
+
+# Only request the (sub)fields that end up in the output; full reference objects are large
+PAPER_FIELDS = "title,authors.name,abstract,year,url"
+REFERENCE_FIELDS = "references.title,references.authors.name,references.year"
+
+# Output files are multi-MB; a large buffer means one write syscall per MiB instead of per 8 KiB
+WRITE_BUFFER_SIZE = 1 << 20
+PARQUET_ROW_GROUP_SIZE = 5000  # Papers buffered per Parquet row group
+
+# Starting a process pool costs more than it saves on small runs, so below this many
+# batches (or on a single CPU) responses are parsed in the calling thread
+POOL_MIN_BATCHES = 10
+
+_get_name = operator.itemgetter("name")
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header (delay in seconds or HTTP date) into seconds, or None if absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _backoff_delay(attempt, polling_interval):
+    """Full-jitter exponential backoff: a random delay up to `polling_interval * 2**attempt`, capped."""
+    return random.uniform(0, min(MAX_BACKOFF, polling_interval * 2 ** attempt))
+
+@functools.lru_cache(maxsize=4096)
+def _join_authors(names):
+    """Join a tuple of author names; memoized because the same author lists recur across references."""
+    return ", ".join(names)
+
+def _format_reference(idx, ref):
+    """Format a single reference in IEEE style, e.g. `[1] A. Author, B. Author, "Title," 2020.`"""
+    ref_authors = _join_authors(tuple(_get_name(author) for author in ref.get("authors", ())))
+    ref_title = ref.get("title") or "No title"
+    ref_year = ref.get("year") or "Unknown"
+    return f'[{idx}] {ref_authors}, "{ref_title}," {ref_year}.'
+
+def _batch_plan(max_papers, batch_size):
     """
-    Search the Semantic Scholar API for papers based on a query string.
+    Split a request for `max_papers` papers into `(offset, limit)` pairs of at most `batch_size`.
+
+    :param max_papers: Maximum number of papers to fetch.
+    :param batch_size: Number of results to fetch in each request.
+    :return: List of `(offset, limit)` tuples in offset order.
+    """
+    pairs = []
+    remaining = max_papers
+    for offset in range(0, max_papers, batch_size):
+        limit = min(batch_size, remaining)  # Ensure not to exceed max_papers
+        pairs.append((offset, limit))
+        remaining -= limit
+    return pairs
+
+def _build_paper(entry, include_references=True, format_references=True):
+    """
+    Convert a paper entry from an API response into the metadata dictionary used for output.
+
+    :param entry: A paper object from the `data` list of a search response.
+    :param include_references: Whether the references of the paper were requested.
+    :param format_references: Whether to format the references as an IEEE-style string
+                              or keep the raw list of reference objects.
+    :return: Dictionary containing metadata for the paper.
+    """
+    references = entry.get("references", [])
+
+    if not include_references:
+        references = ""
+    elif format_references:
+        reference_list = [_format_reference(idx, ref) for idx, ref in enumerate(references, start=1)]
+        references = " ".join(reference_list) if reference_list else "No references available"
+
+    return {
+        "title": entry.get("title", "No title"),
+        "summary": entry.get("abstract", "No abstract available"),
+        # Authors recur across papers, so share a single string object per name
+        "authors": [sys.intern(_get_name(author)) for author in entry.get("authors", ())],
+        "published": entry.get("year", "Unknown"),
+        "pdf_url": entry.get("url", "No URL available"),
+        "references": references
+    }
+
+def _parse_batch(body, include_references=True, format_references=True):
+    """
+    Decode a raw search response and build the papers it contains.
+
+    Kept at module level so it can be shipped to worker processes.
+
+    :param body: Raw JSON body of a search response.
+    :param include_references: Whether the references of the papers were requested.
+    :param format_references: Whether to format the references as an IEEE-style string.
+    :return: List of dictionaries containing metadata for each paper.
+    """
+    data = _json_loads(body)
+    return [_build_paper(entry, include_references, format_references) for entry in data.get("data") or ()]
+
+def _open_cache(cache_path):
+    """
+    Open (and create if needed) the SQLite file used to cache API responses.
+
+    :param cache_path: Path of the SQLite cache file.
+    :return: An open sqlite3 connection.
+    """
+    cache = sqlite3.connect(cache_path)
+    cache.execute(
+        "CREATE TABLE IF NOT EXISTS responses "
+        "(key TEXT PRIMARY KEY, stored_at REAL, body BLOB, etag TEXT, last_modified TEXT)"
+    )
+
+    # Cache files written before validators were stored lack the last two columns
+    columns = {row[1] for row in cache.execute("PRAGMA table_info(responses)")}
+    for column in ("etag", "last_modified"):
+        if column not in columns:
+            cache.execute(f"ALTER TABLE responses ADD COLUMN {column} TEXT")
+    return cache
+
+def _cache_key(url, params):
+    """Build the cache key for a request from its endpoint and sorted parameters."""
+    return hashlib.sha256(url.encode() + json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def _cache_get(cache, key):
+    """Return the `(stored_at, body, etag, last_modified)` cache entry for `key`, or None if missing."""
+    return cache.execute(
+        "SELECT stored_at, body, etag, last_modified FROM responses WHERE key = ?", (key,)
+    ).fetchone()
+
+def _cache_put(cache, key, body, etag=None, last_modified=None):
+    """Store a raw response body and its HTTP validators in the cache under `key`."""
+    cache.execute(
+        "INSERT OR REPLACE INTO responses (key, stored_at, body, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+        (key, time.time(), body, etag, last_modified)
+    )
+    cache.commit()
+
+async def iter_semantic_scholar_batches(query, max_papers=1000, batch_size=100, concurrency=8,
+                                        cache_path="semantic_scholar_cache.sqlite", cache_ttl=7 * 86400,
+                                        max_retries=MAX_RETRIES, polling_interval=POLLING_INTERVAL,
+                                        include_references=True, format_references=True, workers=None):
+    """
+    Search the Semantic Scholar API for papers based on a query string, yielding
+    the papers of each batch as soon as it is available.
+
+    Batch requests are dispatched concurrently, with at most `concurrency`
+    requests in flight at any time; batches are yielded in offset order. Successful
+    responses are cached on disk, so repeating a query within `cache_ttl` seconds
+    does not hit the network.
     
     :param query: The search query string (e.g., keywords, author names, etc.).
     :param max_papers: Maximum number of papers to fetch.
     :param batch_size: Number of results to fetch in each request (maximum 100).
-    :return: List of dictionaries containing metadata for each paper.
+    :param concurrency: Maximum number of simultaneous requests to the API.
+    :param cache_path: Path of the SQLite response cache, or None to disable caching.
+    :param cache_ttl: Number of seconds a cached response stays valid.
+    :param max_retries: Number of times a rate-limited or failed request is retried; batches
+                        that still fail are skipped with a warning.
+    :param polling_interval: Base delay in seconds for the jittered exponential backoff between retries.
+                             Delays, including those taken from Retry-After, never exceed MAX_BACKOFF.
+    :param include_references: Whether to fetch and format the references of each paper.
+    :param format_references: Whether to format the references as an IEEE-style string; when
+                              False the raw list of reference objects is kept, which is much faster.
+    :param workers: Number of worker processes used to decode responses and build papers;
+                    0 does the work in the calling thread, and None uses one process per
+                    CPU only when there are several CPUs and at least `POOL_MIN_BATCHES` batches.
+    :return: Async iterator of lists of dictionaries containing metadata for each paper.
     """
     base_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    papers = []
+    batches = _batch_plan(max_papers, batch_size)
+    plan = iter(batches)
+    fields = f"{PAPER_FIELDS},{REFERENCE_FIELDS}" if include_references else PAPER_FIELDS
+    sem = asyncio.Semaphore(concurrency)
+    cache = _open_cache(cache_path) if cache_path else None
+    parse = functools.partial(_parse_batch, include_references=include_references,
+                              format_references=format_references)
+    # Decoding and reference formatting are CPU-bound, so spread large runs over processes
+    if workers is None:
+        cpus = os.cpu_count() or 1
+        workers = min(cpus, len(batches)) if cpus > 1 and len(batches) >= POOL_MIN_BATCHES else 0
+    executor = concurrent.futures.ProcessPoolExecutor(workers) if workers else None
+    loop = asyncio.get_running_loop()
 
-    # Loop through batches of papers
-    for offset in range(0, max_papers, batch_size):
+    async def download(client, params, headers):
+        offset, limit = params["offset"], params["limit"]
+
+        async with sem:
+            for attempt in range(max_retries + 1):
+                log.debug("Querying Semantic Scholar with offset=%d and limit=%d", offset, limit)
+                content = b""
+                retry_after = None
+
+                try:
+                    response = await client.get(base_url, params=params, headers=headers)
+                    content = response.content
+
+                    if response.status_code in RETRY_STATUSES:
+                        reason = f"status {response.status_code}"
+                        retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                    else:
+                        if response.status_code != 304:  # Not Modified is an answer to a conditional GET
+                            response.raise_for_status()  # Raise an exception for HTTP errors
+                        log.debug("Response status code: %d (%s)", response.status_code, response.http_version)
+                        return response
+
+                except httpx.HTTPStatusError as http_err:
+                    log.error("HTTP error occurred: %s", http_err)
+                    log.debug("Response content: %r", content)
+                    return None
+                except httpx.TransportError as transport_err:
+                    # Timeouts and dropped connections are transient, so retry them too
+                    reason = repr(transport_err)
+                except httpx.RequestError as req_err:
+                    log.error("Request error: %s", req_err)
+                    return None
+                except Exception as e:
+                    log.exception("An unexpected error occurred: %s", e)
+                    return None
+
+                if attempt == max_retries:
+                    break
+
+                # Honour the server's Retry-After (capped, so a bogus header cannot hold a
+                # semaphore slot for hours), otherwise back off with jitter so that
+                # concurrent batches do not all retry at the same moment
+                if retry_after is not None:
+                    delay = min(MAX_BACKOFF, retry_after)
+                else:
+                    delay = _backoff_delay(attempt, polling_interval)
+                log.warning("Got %s at offset=%d, retrying in %.2f seconds", reason, offset, delay)
+                await asyncio.sleep(delay)
+
+        log.warning("Giving up on offset=%d after %d attempts (%s)", offset, max_retries + 1, reason)
+        return None
+
+    async def fetch(client, offset, limit):
         params = {
             "query": query,
             "offset": offset,
-            "limit": min(batch_size, max_papers - len(papers)),  # Ensure not to exceed max_papers
-            "fields": "title,authors,abstract,year,url,references"
+            "limit": limit,
+            "fields": fields
         }
 
-        print(f"\nQuerying Semantic Scholar with offset={offset} and limit={min(batch_size, max_papers - len(papers))}...")
+        content = etag = last_modified = None
+        conditional = {}
+        if cache is not None:
+            key = _cache_key(base_url, params)
+            entry = _cache_get(cache, key)
+            if entry is not None:
+                stored_at, cached_content, etag, last_modified = entry
+                if time.time() - stored_at <= cache_ttl:
+                    content = cached_content
+                else:
+                    # Stale entry: let the server answer 304 Not Modified if it is unchanged
+                    if etag:
+                        conditional["If-None-Match"] = etag
+                    if last_modified:
+                        conditional["If-Modified-Since"] = last_modified
+
+        store = content is None
+        if content is not None:
+            log.debug("Using cached response for offset=%d and limit=%d", offset, limit)
+        else:
+            response = await download(client, params, conditional)
+            if response is None:
+                return None
+
+            if response.status_code == 304:
+                log.debug("Cached response for offset=%d and limit=%d is still current", offset, limit)
+                content = cached_content
+            else:
+                content = response.content
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
 
         try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            
-            print(f"Response status code: {response.status_code}")  # Log status code
-
-            # Check if the response is JSON
-            data = response.json()
-            print("Successfully parsed JSON response.")  # Log successful JSON parsing
-
-            if "data" in data and data["data"]:
-                print(f"Found {len(data['data'])} papers in this batch.")  # Log number of papers found
-                
-                for entry in data["data"]:
-                    title = entry.get("title", "No title")
-                    authors = [author["name"] for author in entry.get("authors", [])]
-                    abstract = entry.get("abstract", "No abstract available")
-                    year = entry.get("year", "Unknown")
-                    url = entry.get("url", "No URL available")
-                    references = entry.get("references", [])
-                    
-                    reference_list = []
-                    for idx, ref in enumerate(references, start=1):
-                        ref_title = ref.get("title", "No title")
-                        ref_authors = ", ".join(author["name"] for author in ref.get("authors", []))
-                        ref_year = ref.get("year", "Unknown")
-                        formatted_reference = f"[{idx}] {ref_authors}, \"{ref_title},\" {ref_year}."
-                        reference_list.append(formatted_reference)
-
-                    paper = {
-                        "title": title,
-                        "summary": abstract,
-                        "authors": authors,
-                        "published": year,
-                        "pdf_url": url,
-                        "references": " ".join(reference_list) if reference_list else "No references available"
-                    }
-                    papers.append(paper)
-
-                    if len(papers) >= max_papers:
-                        print(f"Reached the maximum of {max_papers} papers.")
+            if executor is not None:
+                papers = await loop.run_in_executor(executor, parse, content)
+            else:
+                papers = parse(content)
+        except ValueError as json_err:
+            log.error("JSON decode error: %s", json_err)
+            log.debug("Response content: %r", content)
+            return None
+        except Exception as e:
+            log.exception("An unexpected error occurred: %s", e)
+            return None
+        log.debug("Successfully parsed JSON response for offset=%d", offset)
+
+        # Only cache responses that parsed cleanly; a 304 just refreshes the entry
+        if cache is not None and store:
+            _cache_put(cache, key, content, etag, last_modified)
+
+        if not papers:
+            log.debug("Full response: %r", content)
+        return papers
+
+    fetched = 0
+    failed = 0
+    pending = collections.deque()  # (limit, task) pairs in offset order
+
+    try:
+        # One pooled client for all batches: with HTTP/2 the requests are multiplexed over a
+        # single connection, otherwise keep-alive still pays the TCP and TLS handshakes only once
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency,
+                              keepalive_expiry=30)
+        headers = {"Accept-Encoding": "gzip"}
+        async with httpx.AsyncClient(http2=HTTP2, timeout=30, limits=limits, headers=headers) as client:
+            try:
+                # Keep a window of `concurrency` batches in flight, refilled as each one is consumed
+                for offset, limit in itertools.islice(plan, concurrency):
+                    pending.append((limit, asyncio.ensure_future(fetch(client, offset, limit))))
+
+                # Process the batches in offset order, stopping at the first failed or short batch
+                while pending:
+                    limit, task = pending.popleft()
+                    papers = await task
+                    for offset, next_limit in itertools.islice(plan, 1):
+                        pending.append((next_limit, asyncio.ensure_future(fetch(client, offset, next_limit))))
+
+                    if papers is None:
+                        # The batch failed even after retries; carry on with the rest
+                        failed += 1
+                        continue
+
+                    if not papers:
+                        log.info("No papers found for the given query.")
                         break
 
-            else:
-                print("No papers found for the given query.")
-                print("Full response:", data)  # Print full response for debugging
-                break
+                    log.debug("Found %d papers in this batch.", len(papers))
+                    fetched += len(papers)
+                    yield papers
 
-            # If less papers than requested, we're done
-            if len(data["data"]) < batch_size:
-                print(f"Retrieved all available papers ({len(papers)} total).")
+                    # If less papers than requested, we're done
+                    if len(papers) < limit:
+                        log.info("Retrieved all available papers (%d total).", fetched)
+                        break
+                else:
+                    if not failed:
+                        log.info("Reached the maximum of %d papers.", max_papers)
+
+                if failed:
+                    log.warning("Skipped %d failed batches; retrieved %d papers.", failed, fetched)
+
+            finally:
+                # Drop the batches that are no longer needed
+                for _, task in pending:
+                    task.cancel()
+                await asyncio.gather(*(task for _, task in pending), return_exceptions=True)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if cache is not None:
+            cache.close()
+
+def iter_semantic_scholar(query, max_papers=1000, batch_size=100, **kwargs):
+    """
+    Search the Semantic Scholar API for papers based on a query string, yielding
+    one paper at a time so results can be processed without holding them all in memory.
+
+    Accepts the same keyword arguments as `iter_semantic_scholar_batches`.
+    
+    :param query: The search query string (e.g., keywords, author names, etc.).
+    :param max_papers: Maximum number of papers to fetch.
+    :param batch_size: Number of results to fetch in each request (maximum 100).
+    :return: Iterator of dictionaries containing metadata for each paper.
+    """
+    loop = asyncio.new_event_loop()
+    batches = iter_semantic_scholar_batches(query, max_papers, batch_size, **kwargs)
+
+    try:
+        while True:
+            try:
+                papers = loop.run_until_complete(batches.__anext__())
+            except StopAsyncIteration:
                 break
+            yield from papers
+    finally:
+        loop.run_until_complete(batches.aclose())
+        loop.close()
+
+async def search_semantic_scholar_async(query, max_papers=1000, batch_size=100, **kwargs):
+    """
+    Search the Semantic Scholar API for papers based on a query string.
 
-            # Optional delay to avoid hitting rate limits
-            time.sleep(2)
+    Accepts the same keyword arguments as `iter_semantic_scholar_batches`.
+    
+    :param query: The search query string (e.g., keywords, author names, etc.).
+    :param max_papers: Maximum number of papers to fetch.
+    :param batch_size: Number of results to fetch in each request (maximum 100).
+    :return: List of dictionaries containing metadata for each paper.
+    """
+    return [paper async for papers in iter_semantic_scholar_batches(query, max_papers, batch_size, **kwargs) for paper in papers]
 
-        except requests.exceptions.HTTPError as http_err:
-            print(f"HTTP error occurred: {http_err}")  # Log HTTP errors
-            print(f"Response content: {response.content}")  # Log the content of the response for more info
-            break
-        except requests.exceptions.RequestException as req_err:
-            print(f"Request error: {req_err}")
-            break
-        except ValueError as json_err:
-            print(f"JSON decode error: {json_err}")
-            print(f"Response content: {response.content}")  # Log the response content
-            break
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            break
+def search_semantic_scholar(query, max_papers=1000, batch_size=100, **kwargs):
+    """
+    Search the Semantic Scholar API for papers based on a query string.
+
+    Synchronous wrapper around `search_semantic_scholar_async`; accepts the same
+    keyword arguments as `iter_semantic_scholar_batches`.
+    
+    :param query: The search query string (e.g., keywords, author names, etc.).
+    :param max_papers: Maximum number of papers to fetch.
+    :param batch_size: Number of results to fetch in each request (maximum 100).
+    :return: List of dictionaries containing metadata for each paper.
+    """
+    return asyncio.run(search_semantic_scholar_async(query, max_papers, batch_size, **kwargs))
+
+def _write_csv(papers, file_path):
+    """Write papers as CSV rows and return how many were written."""
+    headers = ["Title", "Authors", "Published", "Summary", "PDF URL", "References"]
+
+    with open(file_path, mode="w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_SIZE) as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        count = 0
+        for paper in papers:
+            references = paper["references"]
+            if not isinstance(references, str):
+                references = _json_dumps(references).decode("utf-8")  # Unformatted references are kept as JSON
+            writer.writerow((paper["title"], ", ".join(paper["authors"]), paper["published"],
+                             paper["summary"], paper["pdf_url"], references))
+            count += 1
+
+        # Push everything to disk once, at the end
+        file.flush()
+        os.fsync(file.fileno())
+
+    return count
+
+def _write_jsonl(papers, file_path):
+    """Write papers as line-delimited JSON and return how many were written."""
+    with open(file_path, mode="wb", buffering=WRITE_BUFFER_SIZE) as file:
+        count = 0
+        for paper in papers:
+            file.write(_json_dumps(paper) + b"\n")
+            count += 1
+
+        # Push everything to disk once, at the end
+        file.flush()
+        os.fsync(file.fileno())
 
-    return papers
+    return count
 
-def save_papers_to_file(papers, folder_path, filename="semantic_scholar_papers.csv"):
+def _parquet_schema(pa, nested_references):
     """
-    Save the metadata of Semantic Scholar papers to a CSV file in a specified folder.
+    Build the Parquet schema for papers. It is declared up front rather than inferred,
+    because a column that is all null in the first row group would otherwise be typed `null`.
+
+    :param pa: The imported pyarrow module.
+    :param nested_references: Whether references are raw reference objects instead of a formatted string.
+    :return: A pyarrow schema.
+    """
+    if nested_references:
+        references = pa.list_(pa.struct([
+            ("title", pa.string()),
+            ("authors", pa.list_(pa.struct([("name", pa.string())]))),
+            ("year", pa.int64()),
+        ]))
+    else:
+        references = pa.string()
+
+    return pa.schema([
+        ("title", pa.string()),
+        ("summary", pa.string()),
+        ("authors", pa.list_(pa.string())),
+        ("published", pa.int64()),
+        ("pdf_url", pa.string()),
+        ("references", references),
+    ])
+
+def _write_parquet(papers, file_path):
+    """Write papers to a zstd-compressed Parquet file and return how many were written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    papers = iter(papers)
+    writer = None
+    count = 0
+
+    try:
+        # Convert the stream one row group at a time so memory stays bounded
+        for chunk in iter(lambda: list(itertools.islice(papers, PARQUET_ROW_GROUP_SIZE)), []):
+            if writer is None:
+                # Unformatted references (format_references=False) are kept as nested objects
+                schema = _parquet_schema(pa, not isinstance(chunk[0]["references"], str))
+                writer = pq.ParquetWriter(file_path, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pylist(chunk, schema=writer.schema))
+            count += len(chunk)
+
+        if writer is None:
+            pq.write_table(_parquet_schema(pa, False).empty_table(), file_path, compression="zstd")
+    except BaseException:
+        # Do not leave a truncated file behind
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return count
+
+OUTPUT_WRITERS = {
+    "csv": _write_csv,
+    "jsonl": _write_jsonl,
+    "parquet": _write_parquet,
+}
+
+def save_papers_to_file(papers, folder_path, filename="semantic_scholar_papers.csv", file_format="csv"):
+    """
+    Save the metadata of Semantic Scholar papers to a file in a specified folder.
     
-    :param papers: A list of dictionaries containing metadata for each paper.
-    :param folder_path: The folder path where the CSV file will be saved.
+    :param papers: An iterable of dictionaries containing metadata for each paper; it is
+                   consumed as rows are written, so a generator streams straight to disk.
+    :param folder_path: The folder path where the file will be saved.
     :param filename: The name of the output file.
+    :param file_format: Output format: "csv", "jsonl" (one JSON object per line, keeps nested
+                        fields intact) or "parquet" (columnar, compressed; requires pyarrow).
     """
-    
+    if file_format not in OUTPUT_WRITERS:
+        raise ValueError(f"Unsupported output format: {file_format!r}")
+
     # Ensure the folder exists
     os.makedirs(folder_path, exist_ok=True)
     file_path = os.path.join(folder_path, filename)
 
-    headers = ["Title", "Authors", "Published", "Summary", "PDF URL", "References"]
-
     try:
-        with open(file_path, mode="w", newline="", encoding="utf-8") as file:
-            writer = csv.DictWriter(file, fieldnames=headers)
-            writer.writeheader()
-            for paper in papers:
-                writer.writerow({
-                    "Title": paper["title"],
-                    "Authors": ", ".join(paper["authors"]),
-                    "Published": paper["published"],
-                    "Summary": paper["summary"],
-                    "PDF URL": paper["pdf_url"],
-                    "References": paper["references"]
-                })
-
-        print(f"Saved {len(papers)} papers to {file_path}")
+        count = OUTPUT_WRITERS[file_format](papers, file_path)
+        log.info("Saved %d papers to %s", count, file_path)
     
     except Exception as e:
-        print(f"Failed to save papers to file: {e}")
+        log.error("Failed to save papers to file: %s", e)
 
-# Example usage
-if __name__ == "__main__":
-    query = "machine learning"  # Change this to your preferred query
-    output_folder = "output_papers"  # Specify your desired output folder
+async def download_semantic_scholar_async(query, folder_path, filename="semantic_scholar_papers.csv",
+                                          file_format="csv", max_papers=1000, batch_size=100,
+                                          queue_size=4, **kwargs):
+    """
+    Search the Semantic Scholar API and save the papers to a file as one streaming pipeline.
 
-    print("Starting paper retrieval...")
+    Batches are fetched (and formatted in worker processes) by the event loop while a
+    thread writes earlier batches to disk, so network, CPU and disk work overlap. At most
+    `queue_size` finished batches wait for the writer; beyond that fetching pauses, which
+    bounds memory regardless of `max_papers`.
 
-    # Fetch all papers for the query
-    papers = search_semantic_scholar(query, max_papers=1000, batch_size=10)
+    Accepts the same keyword arguments as `iter_semantic_scholar_batches`.
 
-    # Print out the results
-    print(f"Total papers retrieved: {len(papers)}")
-    if papers:
-        for paper in papers:
-            print(f"Title: {paper['title']}, Authors: {', '.join(paper['authors'])}, Published: {paper['published']}, PDF URL: {paper['pdf_url']}, References: {paper['references']}")
-    else:
-        print("No papers retrieved.")
+    :param query: The search query string (e.g., keywords, author names, etc.).
+    :param folder_path: The folder path where the file will be saved.
+    :param filename: The name of the output file.
+    :param file_format: Output format, one of the keys of `OUTPUT_WRITERS`.
+    :param max_papers: Maximum number of papers to fetch.
+    :param batch_size: Number of results to fetch in each request (maximum 100).
+    :param queue_size: Maximum number of batches buffered between fetching and writing.
+    """
+    if file_format not in OUTPUT_WRITERS:
+        raise ValueError(f"Unsupported output format: {file_format!r}")
 
-    # Optionally save the results to a CSV file in the specified folder
-    save_papers_to_file(papers, output_folder, "semantic_scholar_papers.csv")
-import requests
-import time
-import csv
-import os
+    loop = asyncio.get_running_loop()
+    papers_queue = asyncio.Queue(maxsize=queue_size)
 
-def format_reference(ref):
-    """Format the reference according to IEEE style."""
-    ref_authors = ", ".join(author["name"] for author in ref.get("authors", []))
-    ref_title = ref.get("title", "No title")
-    ref_year = ref.get("year", "Unknown")
-    
-    return f"{ref_authors}, \"{ref_title},\" {ref_year}."
+    def drain():
+        # Runs in the writer thread: pull batches off the loop's queue until the None sentinel
+        while True:
+            papers = asyncio.run_coroutine_threadsafe(papers_queue.get(), loop).result()
+            if papers is None:
+                return
+            yield from papers
+
+    async def produce():
+        async for papers in iter_semantic_scholar_batches(query, max_papers, batch_size, **kwargs):
+            await papers_queue.put(papers)
+
+    writer = loop.run_in_executor(None, save_papers_to_file, drain(), folder_path, filename, file_format)
+    producer = asyncio.ensure_future(produce())
+
+    try:
+        # Returns once every batch is queued (or fetching failed), or early if the writer stops reading
+        await asyncio.wait((producer, writer), return_when=asyncio.FIRST_COMPLETED)
+
+        if not writer.done():
+            # Let the writer finish the queued batches, then end the stream
+            end_of_stream = asyncio.ensure_future(papers_queue.put(None))
+            await asyncio.wait((end_of_stream, writer), return_when=asyncio.FIRST_COMPLETED)
+            end_of_stream.cancel()
+        await writer
+
+    except asyncio.CancelledError:
+        # Cancelled from outside: drop the unwritten batches and unblock the writer thread
+        # right away, then wait for it to close the file
+        producer.cancel()
+        while not papers_queue.empty():
+            papers_queue.get_nowait()
+        papers_queue.put_nowait(None)
+        await asyncio.wait((writer,))
+        raise
 
-def search_semantic_scholar(query, max_papers=1000, batch_size=100, delay=3):
+    finally:
+        # Stop fetching if the writer gave up early
+        if not producer.done():
+            producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+    # Surface fetch errors instead of reporting a partial file as a success
+    if not producer.cancelled():
+        producer.result()
+
+def download_semantic_scholar(query, folder_path, filename="semantic_scholar_papers.csv",
+                              file_format="csv", max_papers=1000, batch_size=100, **kwargs):
     """
-    Search the Semantic Scholar API for papers based on a query string.
-    
+    Search the Semantic Scholar API and stream the papers into a file.
+
+    Synchronous wrapper around `download_semantic_scholar_async`; accepts the same
+    keyword arguments.
+
     :param query: The search query string (e.g., keywords, author names, etc.).
+    :param folder_path: The folder path where the file will be saved.
+    :param filename: The name of the output file.
+    :param file_format: Output format, one of the keys of `OUTPUT_WRITERS`.
     :param max_papers: Maximum number of papers to fetch.
     :param batch_size: Number of results to fetch in each request (maximum 100).
-    :param delay: Delay in seconds between requests to avoid overloading the API.
-    :return: List of dictionaries containing metadata for each paper.
     """
-    base_url = "https://api.semanticscholar.org/graph/v1/paper/search"
-    start_index = 0
-    papers = []
+    asyncio.run(download_semantic_scholar_async(
+        query, folder_path, filename, file_format, max_papers, batch_size, **kwargs
+    ))
 
-    while len(papers) < max_papers:
-        params = {
-            "query": query,
-            "offset": start_index,
-            "limit": batch_size,
-            "fields": "title,authors,abstract,year,url,references"  # Fields to retrieve
-        }
-        
-        print(f"\nQuerying Semantic Scholar with offset={start_index} and limit={batch_size}...")
-        response = requests.get(base_url, params=params)
+# Example usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download Semantic Scholar search results to a file.")
+    parser.add_argument("--format", choices=sorted(OUTPUT_WRITERS), default="csv", help="Output file format.")
+    parser.add_argument("--verbose", action="store_true", help="Log every request and batch.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    # httpx logs every request at INFO; only show that in verbose mode
+    logging.getLogger("httpx").setLevel(logging.DEBUG if args.verbose else logging.WARNING)
+
+    query = "machine learning"  # Change this to your preferred query
+    output_folder = "output_papers"  # Specify your desired output folder
 
-        # Log the request URL
-        print(f"Request URL: {response.url}")
+    log.info("Starting paper retrieval...")
 
-        # Check if the request was successful
-        if response.status_code != 200:
-            print(f"Error: Failed 
\ No newline at end of file
+    # Fetch, format and write the papers for the query as one streaming pipeline
+    download_semantic_scholar(query, output_folder, f"semantic_scholar_papers.{args.format}", args.format,
+                              max_papers=1000, batch_size=100)